@@ -0,0 +1,92 @@
+"""
+Admission control for the ML service
+
+Each traffic class (interactive scoring, bulk batches) gets its own worker
+pool with a bounded number of queued requests. When a pool is full new work
+is rejected immediately so the caller can answer 429 with Retry-After,
+instead of letting bulk uploads starve dashboard predictions.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when a pool has no room for more work"""
+
+    def __init__(self, pool_name, retry_after):
+        super().__init__(f"{pool_name} pool is saturated")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """
+    Worker pool that admits at most `workers + max_queue` tasks at a time.
+    Tracks queue depth, active workers and rejections for the metrics endpoint.
+    """
+
+    def __init__(self, name, workers, max_queue, retry_after):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-worker")
+        self.capacity = threading.BoundedSemaphore(workers + max_queue)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_queued = 0
+
+    def submit(self, fn, *args, wait=None):
+        """
+        Queue fn(*args) and return its Future. With wait=None a full pool
+        rejects immediately; otherwise block up to `wait` seconds for room.
+        """
+        admitted = self.capacity.acquire(blocking=False) if wait is None else self.capacity.acquire(timeout=wait)
+        if not admitted:
+            with self.lock:
+                self.rejected += 1
+            raise PoolSaturated(self.name, self.retry_after)
+
+        enqueued_at = time.perf_counter()
+        with self.lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        def run():
+            with self.lock:
+                self.queued -= 1
+                self.active += 1
+                self.total_wait += time.perf_counter() - enqueued_at
+            try:
+                return fn(*args)
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    self.completed += 1
+                self.capacity.release()
+
+        return self.executor.submit(run)
+
+    def run(self, fn, *args, wait=None):
+        """Submit fn(*args) and block until it finishes, returning its result"""
+        return self.submit(fn, *args, wait=wait).result()
+
+    def stats(self):
+        """Current queue depth and counters as plain JSON types"""
+        with self.lock:
+            started = self.completed + self.active
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "active": self.active,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_queue_wait_ms": round(self.total_wait / started * 1000, 3) if started else 0.0
+            }
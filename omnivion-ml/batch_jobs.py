@@ -0,0 +1,189 @@
+"""
+Asynchronous bulk scoring jobs for the ML service
+
+A submitted batch is written to its own directory under the jobs root and
+scored chunk by chunk on a background thread. Every finished chunk is saved
+to disk before the job's progress is advanced, so after a restart a job
+resumes from its last completed chunk instead of starting over.
+
+    jobs/<job_id>/job.json          status and progress
+    jobs/<job_id>/input.json        submitted students
+    jobs/<job_id>/chunk_00000.json  predictions for each finished chunk
+"""
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+# Job ids are uuid4 hex strings; anything else is rejected before touching paths
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def write_json_atomic(path, data):
+    """Write JSON through a temp file so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    """Read a JSON file written by write_json_atomic"""
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+class JobRunner:
+    """
+    Persists bulk scoring jobs on disk and works through them on one
+    background thread. `score_chunk` takes a list of students and returns
+    their predictions.
+    """
+
+    def __init__(self, root, score_chunk, chunk_size=500):
+        self.root = root
+        self.score_chunk = score_chunk
+        self.chunk_size = chunk_size
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def _job_dir(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id):
+            raise ValueError(f"Invalid job id '{job_id}'")
+        return os.path.join(self.root, job_id)
+
+    def _meta_path(self, job_id):
+        return os.path.join(self._job_dir(job_id), 'job.json')
+
+    def _chunk_path(self, job_id, index):
+        return os.path.join(self._job_dir(job_id), f'chunk_{index:05d}.json')
+
+    def _update(self, job_id, **changes):
+        """Apply changes to a job's metadata and persist it"""
+        with self.lock:
+            meta = read_json(self._meta_path(job_id))
+            meta.update(changes, updated_at=time.time())
+            write_json_atomic(self._meta_path(job_id), meta)
+            return meta
+
+    def submit(self, students):
+        """Persist a new job and queue it; returns its metadata"""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._job_dir(job_id))
+        write_json_atomic(os.path.join(self._job_dir(job_id), 'input.json'), students)
+
+        now = time.time()
+        meta = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "total": len(students),
+            "chunk_size": self.chunk_size,
+            "total_chunks": (len(students) + self.chunk_size - 1) // self.chunk_size,
+            "completed_chunks": 0,
+            "processed": 0,
+            "chunk_counts": [],
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        write_json_atomic(self._meta_path(job_id), meta)
+        self.pending.put(job_id)
+        return meta
+
+    def get(self, job_id):
+        """Job metadata, or None if there is no such job"""
+        try:
+            return read_json(self._meta_path(job_id))
+        except (OSError, ValueError):
+            return None
+
+    def results(self, job_id, page, page_size):
+        """
+        One page of predictions from the chunks finished so far.
+        Chunk sizes are kept in the metadata so only the chunks
+        overlapping the page are read.
+        """
+        meta = self.get(job_id)
+        if meta is None:
+            return None
+
+        start = (page - 1) * page_size
+        stop = start + page_size
+        predictions = []
+        offset = 0
+        for index, count in enumerate(meta["chunk_counts"]):
+            if offset + count > start and offset < stop:
+                chunk = read_json(self._chunk_path(job_id, index))
+                predictions.extend(chunk[max(0, start - offset):stop - offset])
+            offset += count
+            if offset >= stop:
+                break
+
+        return meta, predictions
+
+    def start(self):
+        """Start the worker thread and requeue jobs left unfinished by a previous run"""
+        if self.thread is not None:
+            return
+
+        unfinished = []
+        for job_id in os.listdir(self.root):
+            # Skip stray files (e.g. .DS_Store) and anything that is not a job
+            if not JOB_ID_PATTERN.match(job_id) or not os.path.isdir(os.path.join(self.root, job_id)):
+                continue
+            meta = self.get(job_id)
+            if meta and meta["status"] in (QUEUED, RUNNING):
+                unfinished.append(meta)
+        for meta in sorted(unfinished, key=lambda m: m["created_at"]):
+            print(f"🔁 Resuming job {meta['job_id']} at chunk "
+                  f"{meta['completed_chunks']}/{meta['total_chunks']}")
+            self.pending.put(meta["job_id"])
+
+        self.thread = threading.Thread(target=self._work, name="job-runner", daemon=True)
+        self.thread.start()
+
+    def _work(self):
+        while True:
+            job_id = self.pending.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                print(f"❌ Job {job_id} failed: {e}")
+                # A job whose files are gone must not take the runner thread down
+                try:
+                    self._update(job_id, status=FAILED, error=str(e))
+                except Exception as update_error:
+                    print(f"❌ Could not mark job {job_id} as failed: {update_error}")
+
+    def _run(self, job_id):
+        """Score the remaining chunks of a job, saving each before moving on"""
+        meta = self.get(job_id)
+        if meta is None or meta["status"] in (COMPLETED, FAILED):
+            return
+        meta = self._update(job_id, status=RUNNING)
+        students = read_json(os.path.join(self._job_dir(job_id), 'input.json'))
+        chunk_size = meta["chunk_size"]
+        chunk_counts = meta["chunk_counts"]
+        processed = meta["processed"]
+
+        for index in range(meta["completed_chunks"], meta["total_chunks"]):
+            chunk = students[index * chunk_size:(index + 1) * chunk_size]
+            predictions = self.score_chunk(chunk)
+            write_json_atomic(self._chunk_path(job_id, index), predictions)
+
+            chunk_counts.append(len(predictions))
+            processed += len(chunk)
+            self._update(job_id, completed_chunks=index + 1, processed=processed, chunk_counts=chunk_counts)
+
+        self._update(job_id, status=COMPLETED)
@@ -0,0 +1,280 @@
+"""
+Streaming feature monitoring for the ML service
+
+Keeps per-feature sketches over the rows sent to /predict and /predict_batch
+(counts, missing rate, Welford mean/variance, min/max and a histogram over
+the baseline decile bins) and scores drift against a baseline saved
+alongside the model at training time.
+
+Live quantiles are approximate: they are interpolated inside those 10
+fixed bins, so they are only as precise as the bin the quantile lands in.
+"""
+import bisect
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Quantiles used to place the histogram bin edges in the baseline
+BASELINE_QUANTILES = np.linspace(0, 1, 11)[1:-1]
+
+# Quantiles reported for live traffic
+QUANTILE_METHOD = "approximate: linear interpolation within baseline decile bins"
+REPORTED_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+# Avoids log(0) / division by zero in PSI for empty bins
+PSI_EPSILON = 1e-4
+
+
+def to_float(value):
+    """Numeric value of a raw request field, NaN when absent, not numeric or infinite"""
+    if value is None:
+        return np.nan
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value if np.isfinite(value) else np.nan
+
+
+def build_baseline(X, features=None):
+    """
+    Build a drift baseline from a training feature matrix.
+    Bin edges are taken from the training quantiles, so every bin holds
+    roughly the same share of training rows.
+    """
+    X = pd.DataFrame(X)
+    features = features or list(X.columns)
+    baseline = {}
+
+    for feature in features:
+        values = pd.to_numeric(X[feature], errors='coerce').dropna().to_numpy(dtype=float)
+        if len(values) == 0:
+            continue
+        edges = np.unique(np.quantile(values, BASELINE_QUANTILES))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        baseline[feature] = {
+            "edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist(),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "count": int(len(values))
+        }
+
+    return baseline
+
+
+def save_baseline(baseline, path):
+    """Write a baseline built by build_baseline to disk"""
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2)
+
+
+def load_baseline(path):
+    """Load a baseline from disk, returning None if it is missing or unreadable"""
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except Exception as e:
+        print(f"⚠️  Drift baseline not loaded: {e}")
+        return None
+
+
+class FeatureMonitor:
+    """
+    Incremental per-feature statistics over live traffic.
+    Each batch is folded in with vectorized NumPy operations, and single
+    records skip pandas entirely, so the cost per row is constant regardless
+    of how much traffic has been seen.
+    """
+
+    def __init__(self, features, baseline=None):
+        self.features = list(features)
+        self.feature_set = set(self.features)
+        self.baseline = baseline or {}
+        # Plain-list copies of the bin edges for the single-record path
+        self.edges = {f: list(self.baseline[f]["edges"]) for f in self.features if f in self.baseline}
+        self.binned_columns = [(i, f) for i, f in enumerate(self.features) if f in self.edges]
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all live statistics, keeping the baseline"""
+        n = len(self.features)
+        with self.lock:
+            self.rows = 0
+            self.count = np.zeros(n)
+            self.missing = np.zeros(n)
+            self.mean = np.zeros(n)
+            self.m2 = np.zeros(n)
+            self.min = np.full(n, np.inf)
+            self.max = np.full(n, -np.inf)
+            self.histograms = {
+                f: np.zeros(len(self.baseline[f]["edges"]) + 1)
+                for f in self.features if f in self.baseline
+            }
+            self.unexpected_fields = {}
+
+    def observe(self, records):
+        """
+        Fold a list of raw request records into the sketches.
+        Values are read before any defaulting, so absent, non-numeric or
+        infinite fields count as missing.
+        """
+        if not records:
+            return
+        if len(records) == 1:
+            self._observe_one(records[0])
+            return
+
+        frame = pd.DataFrame(records)
+        extra = {
+            c: int(frame[c].notna().sum())
+            for c in frame.columns if c not in self.feature_set and c != 'student_id'
+        }
+        values = (
+            frame.reindex(columns=self.features)
+            .apply(pd.to_numeric, errors='coerce')
+            .to_numpy(dtype=float)
+        )
+        present = np.isfinite(values)
+
+        batch_count = present.sum(axis=0)
+        batch_sum = np.where(present, values, 0).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            batch_mean = np.where(batch_count > 0, batch_sum / batch_count, 0)
+        batch_m2 = (np.where(present, values - batch_mean, 0) ** 2).sum(axis=0)
+        batch_min = np.where(present, values, np.inf).min(axis=0)
+        batch_max = np.where(present, values, -np.inf).max(axis=0)
+
+        binned = {}
+        for i, feature in self.binned_columns:
+            column = values[present[:, i], i]
+            binned[feature] = np.bincount(
+                np.searchsorted(self.edges[feature], column, side='right'),
+                minlength=len(self.histograms[feature])
+            )
+
+        with self.lock:
+            # Chan et al. parallel form of Welford's update for merging a batch
+            total = self.count + batch_count
+            delta = batch_mean - self.mean
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ratio = np.where(total > 0, batch_count / total, 0)
+            self.mean = self.mean + delta * ratio
+            self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * ratio
+            self.count = total
+
+            self.rows += len(frame)
+            self.missing += len(frame) - batch_count
+            self.min = np.minimum(self.min, batch_min)
+            self.max = np.maximum(self.max, batch_max)
+            for feature, counts in binned.items():
+                self.histograms[feature] += counts
+            for field, count in extra.items():
+                self.unexpected_fields[field] = self.unexpected_fields.get(field, 0) + count
+
+    def _observe_one(self, record):
+        """
+        Single-record fast path for /predict: reads the dict straight into a
+        NumPy row and applies the plain Welford update, skipping DataFrame
+        construction entirely
+        """
+        row = np.array([to_float(record.get(f)) for f in self.features])
+        present = np.isfinite(row)
+        bins = [
+            (f, bisect.bisect_right(self.edges[f], row[i]))
+            for i, f in self.binned_columns if present[i]
+        ]
+        extra = [
+            k for k, v in record.items()
+            if k not in self.feature_set and k != 'student_id' and v is not None
+        ]
+
+        with self.lock:
+            self.rows += 1
+            self.missing += ~present
+            self.count += present
+            x = np.where(present, row, 0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                delta = np.where(present, x - self.mean, 0)
+                self.mean += np.where(present, delta / self.count, 0)
+            self.m2 += delta * np.where(present, x - self.mean, 0)
+            self.min = np.where(present, np.minimum(self.min, x), self.min)
+            self.max = np.where(present, np.maximum(self.max, x), self.max)
+            for feature, index in bins:
+                self.histograms[feature][index] += 1
+            for field in extra:
+                self.unexpected_fields[field] = self.unexpected_fields.get(field, 0) + 1
+
+    def _quantiles(self, feature, histogram, lo, hi):
+        """
+        Approximate live quantiles by interpolating inside the baseline bins.
+        The outer bins are bounded by the observed min and max.
+        """
+        total = histogram.sum()
+        if total == 0:
+            return None
+        bounds = np.concatenate([[lo], self.baseline[feature]["edges"], [hi]])
+        bounds = np.clip(bounds, lo, hi)
+        cdf = np.concatenate([[0], np.cumsum(histogram) / total])
+        return {
+            str(q): round(float(np.interp(q, cdf, bounds)), 4)
+            for q in REPORTED_QUANTILES
+        }
+
+    def _drift(self, feature, histogram):
+        """PSI and binned KS statistic of live traffic against the baseline"""
+        total = histogram.sum()
+        if total == 0:
+            return None
+        expected = np.asarray(self.baseline[feature]["proportions"])
+        actual = histogram / total
+        e = np.clip(expected, PSI_EPSILON, None)
+        a = np.clip(actual, PSI_EPSILON, None)
+        psi = float(np.sum((a - e) * np.log(a / e)))
+        ks = float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected))))
+        return {
+            "psi": round(psi, 4),
+            "ks": round(ks, 4),
+            "status": "drift" if psi >= 0.25 else "warning" if psi >= 0.1 else "stable"
+        }
+
+    def snapshot(self):
+        """Return the current statistics and drift scores as plain JSON types"""
+        with self.lock:
+            rows = self.rows
+            count = self.count.copy()
+            missing = self.missing.copy()
+            mean = self.mean.copy()
+            m2 = self.m2.copy()
+            lo = self.min.copy()
+            hi = self.max.copy()
+            histograms = {f: h.copy() for f, h in self.histograms.items()}
+            unexpected = dict(self.unexpected_fields)
+
+        features = {}
+        for i, feature in enumerate(self.features):
+            stats = {
+                "count": int(count[i]),
+                "missing_rate": round(float(missing[i] / rows), 4) if rows else 0.0,
+                "mean": round(float(mean[i]), 4) if count[i] else None,
+                "std": round(float(np.sqrt(m2[i] / (count[i] - 1))), 4) if count[i] > 1 else None,
+                "min": float(lo[i]) if count[i] else None,
+                "max": float(hi[i]) if count[i] else None,
+                "quantiles": None,
+                "drift": None
+            }
+            if feature in histograms and count[i]:
+                stats["quantiles"] = self._quantiles(feature, histograms[feature], lo[i], hi[i])
+                stats["drift"] = self._drift(feature, histograms[feature])
+            features[feature] = stats
+
+        return {
+            "rows_observed": rows,
+            "baseline_loaded": bool(self.baseline),
+            "quantile_method": QUANTILE_METHOD,
+            "features": features,
+            "unexpected_fields": unexpected
+        }
@@ -0,0 +1,175 @@
+"""
+Endpoint tests for the ML service, run against a small stand-in model
+
+Run from omnivion-ml/:
+    python -m pytest -q test_app.py
+"""
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xgboost = pytest.importorskip("xgboost")
+
+import app as service
+from batch_jobs import JobRunner
+
+STUDENT = {
+    "student_id": "S1", "age": 20, "cgpa": 4.5, "attendance_rate": 55, "family_income": 50000,
+    "past_failures": 4, "study_hours_per_week": 6, "assignments_submitted": 20,
+    "projects_completed": 1, "total_activities": 2, "scholarship": 0, "extra_curricular": 0,
+    "sports_participation": 0, "parental_education": 1, "gender": 1, "department": 4
+}
+
+
+def strict_json(text):
+    """Parse JSON the way JSON.parse does, rejecting NaN and Infinity"""
+    def reject(constant):
+        raise ValueError(f"invalid JSON constant {constant}")
+    return json.loads(text, parse_constant=reject)
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 10, (400, len(service.EXPECTED_FEATURES))), columns=service.EXPECTED_FEATURES)
+    y = (X.cgpa + rng.normal(0, 1, len(X)) < 5).astype(int)
+    return xgboost.XGBClassifier(n_estimators=20, max_depth=3).fit(X, y)
+
+
+@pytest.fixture
+def client(model, monkeypatch, tmp_path):
+    runner = JobRunner(str(tmp_path / "jobs"), service.score_job_chunk, chunk_size=2)
+    runner.start()
+    monkeypatch.setattr(service, "model", model)
+    monkeypatch.setattr(service, "compiled_model", None)
+    monkeypatch.setattr(service, "job_runner", runner)
+    return service.app.test_client()
+
+
+def wait_for_job(client, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f"/jobs/{job_id}").get_json()
+        if status["status"] in ("completed", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_json_job_completes_and_pages(client):
+    response = client.post("/jobs", json={"students": [dict(STUDENT, student_id=f"S{i}") for i in range(5)]})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    assert wait_for_job(client, job_id)["status"] == "completed"
+    page = client.get(f"/jobs/{job_id}/results?page=2&page_size=3").get_json()
+    assert [p["student_id"] for p in page["predictions"]] == ["S3", "S4"]
+    assert page["has_more"] is False
+
+
+def test_csv_job_results_are_valid_json(client):
+    frame = pd.DataFrame([dict(STUDENT, student_id=i) for i in ("007", "", "2")])
+    frame.loc[2, "cgpa"] = None
+    upload = io.BytesIO(frame.to_csv(index=False).encode())
+
+    response = client.post("/jobs", data={"file": (upload, "students.csv")}, content_type="multipart/form-data")
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    assert wait_for_job(client, job_id)["status"] == "completed"
+    with open(service.job_runner._job_dir(job_id) + "/input.json") as file:
+        strict_json(file.read())
+
+    results = strict_json(client.get(f"/jobs/{job_id}/results").get_data(as_text=True))
+    assert [p["student_id"] for p in results["predictions"]] == ["007", "unknown", "2"]
+
+
+def test_unknown_or_invalid_job_id_is_404(client):
+    assert client.get("/jobs/0123456789abcdef0123456789abcdef").status_code == 404
+    assert client.get("/jobs/..").status_code == 404
+    assert client.get("/jobs/../results").status_code == 404
+
+
+def stub_bulk_pool(monkeypatch, saturated_calls):
+    """Make the given calls to bulk_pool.run (1-based) fail as if the pool were full"""
+    run = service.bulk_pool.run
+    calls = []
+
+    def saturating_run(fn, *args, wait=None):
+        calls.append(wait)
+        if len(calls) in saturated_calls:
+            raise service.PoolSaturated('bulk', 10)
+        return run(fn, *args, wait=wait)
+
+    monkeypatch.setattr(service.bulk_pool, "run", saturating_run)
+    return calls
+
+
+def test_batch_is_chunked_and_complete(client, monkeypatch):
+    calls = stub_bulk_pool(monkeypatch, saturated_calls=())
+    n = service.BATCH_CHUNK_SIZE + 3
+    response = client.post("/predict_batch", json={"students": [STUDENT] * n})
+    assert response.status_code == 200
+    assert response.get_json()["total_processed"] == n
+    assert calls == [None, service.CHUNK_ADMISSION_WAIT]
+
+
+def test_batch_rejected_when_bulk_pool_full(client, monkeypatch):
+    stub_bulk_pool(monkeypatch, saturated_calls=(1,))
+    observed = service.feature_monitor.snapshot()["rows_observed"]
+
+    response = client.post("/predict_batch", json={"students": [STUDENT] * 3})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+    assert service.feature_monitor.snapshot()["rows_observed"] == observed
+
+
+def test_batch_cut_short_is_an_error_with_partial_results(client, monkeypatch):
+    stub_bulk_pool(monkeypatch, saturated_calls=(2,))
+    observed = service.feature_monitor.snapshot()["rows_observed"]
+    n = service.BATCH_CHUNK_SIZE * 2 + 1
+
+    response = client.post("/predict_batch", json={"students": [STUDENT] * n})
+    body = response.get_json()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "10"
+    assert body["partial"] is True
+    assert body["processed_students"] == len(body["predictions"]) == service.BATCH_CHUNK_SIZE
+    assert body["total_students"] == n
+    assert service.feature_monitor.snapshot()["rows_observed"] == observed + service.BATCH_CHUNK_SIZE
+
+
+def test_whatif_scores_grid(client):
+    response = client.post("/predict_whatif", json={
+        "student": STUDENT,
+        "perturbations": {"attendance_rate": {"min": 55, "max": 95, "step": 5}, "cgpa": [4.5, 6, 8]}
+    })
+    assert response.status_code == 200
+    assert response.get_json()["total_scenarios"] == 27
+
+
+@pytest.mark.parametrize("spec", [
+    {"min": 0, "max": 1e8, "step": 1},
+    {"min": 0, "max": 100, "step": 1e-320},
+    {"min": 0, "max": 1e300, "step": 1e-300},
+    {"min": -1e308, "max": 1e308, "step": 1},
+])
+def test_whatif_rejects_oversized_range(client, spec):
+    response = client.post("/predict_whatif", json={"student": STUDENT, "perturbations": {"cgpa": spec}})
+    assert response.status_code == 400
+    assert "Too many scenarios" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("body", [
+    {"student": STUDENT, "perturbations": {"cgpa": {"min": 0, "max": "inf", "step": 1}}},
+    {"student": "abc", "perturbations": {"cgpa": [5]}},
+    {"student": [STUDENT], "perturbations": {"cgpa": [5]}},
+    [STUDENT],
+])
+def test_whatif_rejects_malformed_request(client, body):
+    response = client.post("/predict_whatif", json=body)
+    assert response.status_code == 400
@@ -0,0 +1,98 @@
+"""
+Tests for the streaming feature monitor
+
+Run from omnivion-ml/:
+    python -m pytest -q test_drift_monitor.py
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from drift_monitor import FeatureMonitor, build_baseline, to_float
+
+FEATURES = ['age', 'cgpa', 'attendance_rate']
+
+
+def make_monitor():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'age': rng.integers(17, 26, 500),
+        'cgpa': rng.uniform(3, 10, 500),
+        'attendance_rate': rng.uniform(40, 100, 500),
+    })
+    return FeatureMonitor(FEATURES, build_baseline(X))
+
+
+def make_records(n=300, seed=1):
+    """Live records with absent, null, non-numeric, infinite and unexpected fields"""
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n):
+        record = {
+            'student_id': f'S{i}',
+            'age': int(rng.integers(17, 30)),
+            'cgpa': float(rng.uniform(2, 10)),
+            'attendance_rate': str(round(float(rng.uniform(30, 100)), 2)),
+        }
+        if i % 7 == 0:
+            record['cgpa'] = None
+        if i % 11 == 0:
+            record['attendance_rate'] = 'n/a'
+        if i % 13 == 0:
+            del record['age']
+        if i % 17 == 0:
+            record['age'] = 'inf'
+        if i % 19 == 0:
+            record['cgpa'] = float('-inf')
+        if i % 5 == 0:
+            record['nickname'] = 'x'
+        records.append(record)
+    return records
+
+
+def strict_json(data):
+    """Serialize the way the service responds, rejecting NaN and Infinity"""
+    return json.loads(json.dumps(data, allow_nan=False))
+
+
+@pytest.mark.parametrize("value, expected", [
+    (3, 3.0), ("4.5", 4.5), (None, None), ("n/a", None), ("inf", None), (float("-inf"), None), (float("nan"), None)
+])
+def test_to_float(value, expected):
+    result = to_float(value)
+    assert (np.isnan(result) if expected is None else result == expected)
+
+
+def test_single_record_path_matches_batch_path():
+    records = make_records()
+    batch, single = make_monitor(), make_monitor()
+    batch.observe(records)
+    for record in records:
+        single.observe([record])
+
+    expected, actual = batch.snapshot(), single.snapshot()
+    assert expected["rows_observed"] == actual["rows_observed"] == len(records)
+    assert expected["unexpected_fields"] == actual["unexpected_fields"] == {'nickname': 60}
+    for feature in FEATURES:
+        e, a = expected["features"][feature], actual["features"][feature]
+        for key in ("count", "missing_rate", "min", "max", "quantiles", "drift"):
+            assert e[key] == a[key], (feature, key)
+        assert e["mean"] == pytest.approx(a["mean"], abs=1e-3)
+        assert e["std"] == pytest.approx(a["std"], abs=1e-3)
+
+
+def test_infinite_values_count_as_missing():
+    monitor = make_monitor()
+    monitor.observe([{'age': 'inf', 'cgpa': 7.0, 'attendance_rate': 80}])
+    monitor.observe([{'age': 20, 'cgpa': float('inf'), 'attendance_rate': 90},
+                     {'age': 22, 'cgpa': 8.0, 'attendance_rate': float('-inf')}])
+
+    snapshot = strict_json(monitor.snapshot())
+    age = snapshot["features"]["age"]
+    assert age["count"] == 2
+    assert age["mean"] == 21.0
+    assert age["missing_rate"] == pytest.approx(1 / 3, abs=1e-4)
+    assert snapshot["features"]["cgpa"]["max"] == 8.0
+    assert snapshot["features"]["attendance_rate"]["min"] == 80.0
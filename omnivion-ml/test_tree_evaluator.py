@@ -0,0 +1,93 @@
+"""
+Parity tests for the flat-array tree evaluator
+
+Run from omnivion-ml/:
+    python -m pytest -q test_tree_evaluator.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+xgboost = pytest.importorskip("xgboost")
+
+from tree_evaluator import DEFAULT_TOLERANCE, CompiledTreeModel, compile_model, make_probe
+
+FEATURES = ['age', 'cgpa', 'attendance_rate', 'family_income', 'past_failures', 'study_hours_per_week']
+
+
+def make_data(n=1500, seed=0):
+    """Raw-scale features like the service receives, with a learnable target"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'age': rng.integers(17, 26, n),
+        'cgpa': rng.uniform(3, 10, n),
+        'attendance_rate': rng.uniform(40, 100, n),
+        'family_income': rng.uniform(1e4, 1e5, n),
+        'past_failures': rng.integers(0, 7, n),
+        'study_hours_per_week': rng.uniform(0, 30, n),
+    }).astype(float)
+    logit = -0.6 * (X.cgpa - 6) - 0.05 * (X.attendance_rate - 70) + 0.4 * X.past_failures - 1
+    y = (rng.uniform(size=n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return X, y
+
+
+def assert_parity(model, X):
+    compiled = CompiledTreeModel.from_xgboost(model)
+    expected = model.predict_proba(X)[:, 1]
+    actual = compiled.predict_proba(np.asarray(X, dtype=float))[:, 1]
+    assert np.max(np.abs(expected - actual)) <= DEFAULT_TOLERANCE
+
+
+def test_matches_predict_proba_on_split_probe():
+    X, y = make_data()
+    model = xgboost.XGBClassifier(n_estimators=60, max_depth=6, learning_rate=0.1).fit(X, y)
+
+    compiled = CompiledTreeModel.from_xgboost(model)
+    probe = make_probe(compiled)
+    assert_parity(model, pd.DataFrame(probe, columns=FEATURES))
+    assert_parity(model, X)
+
+
+def test_probe_covers_both_sides_of_every_split():
+    X, y = make_data()
+    model = xgboost.XGBClassifier(n_estimators=20, max_depth=4).fit(X, y)
+    compiled = CompiledTreeModel.from_xgboost(model)
+    probe = make_probe(compiled)
+
+    for node in np.flatnonzero(compiled.feature >= 0):
+        column = probe[:, compiled.feature[node]].astype(np.float32)
+        assert (column < compiled.threshold[node]).any()
+        assert (column >= compiled.threshold[node]).any()
+
+
+def test_missing_values_follow_default_direction():
+    X, y = make_data()
+    X.loc[::7, 'attendance_rate'] = np.nan
+    model = xgboost.XGBClassifier(n_estimators=40, max_depth=5).fit(X, y)
+
+    X_test = X.copy()
+    X_test.loc[::3, 'cgpa'] = np.nan
+    assert_parity(model, X_test)
+
+
+def test_respects_early_stopping_best_iteration():
+    X, y = make_data()
+    model = xgboost.XGBClassifier(n_estimators=400, learning_rate=0.3, early_stopping_rounds=5)
+    model.fit(X[:1000], y[:1000], eval_set=[(X[1000:], y[1000:])], verbose=False)
+    assert model.best_iteration < 399
+
+    compiled = CompiledTreeModel.from_xgboost(model)
+    assert len(compiled.roots) == model.best_iteration + 1
+    assert_parity(model, X)
+
+
+def test_compile_model_accepts_model_fitted_on_arrays():
+    X, y = make_data()
+    model = xgboost.XGBClassifier(n_estimators=30, max_depth=4).fit(X.to_numpy(), y)
+    assert compile_model(model) is not None
+
+
+def test_compile_model_rejects_unsupported_objective():
+    X, y = make_data()
+    model = xgboost.XGBClassifier(n_estimators=5, objective='binary:hinge').fit(X, y)
+    assert compile_model(model) is None
@@ -0,0 +1,205 @@
+"""
+Flat-array evaluator for the service's XGBoost model
+
+Exports every tree of the loaded booster into contiguous NumPy arrays
+(feature index, threshold, children, leaf value) and scores batches with a
+level-by-level vectorized traversal. For small batches this skips the
+DMatrix construction and thread-pool dispatch that dominate predict_proba.
+
+Run directly to benchmark against predict_proba:
+    python tree_evaluator.py
+"""
+import json
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+# Maximum absolute difference in probability accepted against predict_proba
+DEFAULT_TOLERANCE = 1e-4
+
+
+class CompiledTreeModel:
+    """
+    Binary logistic XGBoost model flattened into arrays. Node i of the
+    forest splits on feature[i] at threshold[i]; x < threshold goes to
+    left[i], otherwise right[i], and NaN goes to missing[i]. Leaves have
+    feature -1, point to themselves and carry their output in value[i].
+    """
+
+    def __init__(self, feature, threshold, left, right, missing, value, roots, depth, base_margin, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing = missing
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.base_margin = base_margin
+        self.n_features = n_features
+        self.is_leaf = feature < 0
+        # Leaves read column 0; the value is discarded by the leaf mask
+        self.split_feature = np.where(self.is_leaf, 0, feature)
+
+    @classmethod
+    def from_xgboost(cls, model):
+        """Compile a fitted XGBClassifier; raises ValueError for unsupported models"""
+        booster = model.get_booster()
+        config = json.loads(booster.save_config())
+        objective = config['learner']['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported objective '{objective}'")
+
+        # Newer XGBoost releases store base_score as a one-element list string
+        base_score = float(config['learner']['learner_model_param']['base_score'].strip('[]'))
+        base_margin = float(np.log(base_score / (1 - base_score)))
+
+        names = getattr(model, 'feature_names_in_', None)
+        names = list(names) if names is not None else list(booster.feature_names or [])
+        n_features = int(booster.num_features())
+        column_of = {name: i for i, name in enumerate(names)}
+        column_of.update({f'f{i}': i for i in range(n_features)})
+
+        trees = booster.trees_to_dataframe()
+
+        # predict_proba only uses trees up to the early-stopping best iteration
+        try:
+            best_iteration = int(model.best_iteration)
+            trees = trees[trees['Tree'] <= best_iteration]
+        except (AttributeError, TypeError):
+            pass
+
+        trees = trees.reset_index(drop=True)
+        index_of = {node_id: i for i, node_id in enumerate(trees['ID'])}
+        n_nodes = len(trees)
+
+        is_leaf = (trees['Feature'] == 'Leaf').to_numpy()
+        own = np.arange(n_nodes, dtype=np.int32)
+
+        def children(column):
+            return np.array(
+                [own[i] if is_leaf[i] else index_of[c] for i, c in enumerate(trees[column])],
+                dtype=np.int32
+            )
+
+        feature = np.array(
+            [-1 if is_leaf[i] else column_of[f] for i, f in enumerate(trees['Feature'])],
+            dtype=np.int32
+        )
+        threshold = np.where(is_leaf, 0, trees['Split'].fillna(0)).astype(np.float32)
+        value = np.where(is_leaf, trees['Gain'], 0).astype(np.float64)
+        roots = np.flatnonzero(trees['Node'].to_numpy() == 0).astype(np.int32)
+
+        left = children('Yes')
+        right = children('No')
+        missing = children('Missing')
+
+        # Longest root-to-leaf path bounds the number of traversal steps
+        depth_of = np.zeros(n_nodes, dtype=np.int32)
+        for i in range(n_nodes):
+            if not is_leaf[i]:
+                depth_of[left[i]] = depth_of[i] + 1
+                depth_of[right[i]] = depth_of[i] + 1
+
+        return cls(feature, threshold, left, right, missing, value, roots,
+                   int(depth_of.max()), base_margin, n_features)
+
+    def predict_margin(self, X):
+        """Raw margin for each row of a 2-D array"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+
+        for _ in range(self.depth):
+            x = X[rows, self.split_feature[node]]
+            step = np.where(x < self.threshold[node], self.left[node], self.right[node])
+            node = np.where(np.isnan(x), self.missing[node], step)
+
+        return self.base_margin + self.value[node].sum(axis=1)
+
+    def predict_proba(self, X):
+        """Class probabilities in the same (n_rows, 2) layout as XGBClassifier.predict_proba"""
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1 - p, p])
+
+
+def make_probe(compiled, n_rows=512, seed=0):
+    """
+    Probe rows that exercise both sides of every split. For each feature the
+    candidate values are each split threshold nudged just below and just
+    above, plus 0 (the service's fillna default); every candidate appears in
+    at least one row and the rest of each row is drawn from the other
+    features' candidates at random.
+    """
+    rng = np.random.default_rng(seed)
+    candidates = []
+    for f in range(compiled.n_features):
+        thresholds = np.unique(compiled.threshold[compiled.feature == f]).astype(np.float64)
+        eps = np.maximum(np.abs(thresholds) * 1e-4, 1e-4)
+        candidates.append(np.unique(np.concatenate([thresholds - eps, thresholds + eps, [0.0]])))
+
+    n_rows = max(n_rows, max(len(c) for c in candidates))
+    probe = np.empty((n_rows, compiled.n_features))
+    for f, values in enumerate(candidates):
+        column = np.resize(values, n_rows)
+        probe[:, f] = rng.permutation(column)
+    return probe
+
+
+def compile_model(model, columns=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compile a model and check it against predict_proba on split-threshold
+    probe rows. `columns` names the probe columns for models fitted on a
+    DataFrame. Returns None when the model cannot be compiled or disagrees
+    beyond tolerance.
+    """
+    try:
+        compiled = CompiledTreeModel.from_xgboost(model)
+        probe = make_probe(compiled)
+        expected = np.asarray(model.predict_proba(pd.DataFrame(probe, columns=columns) if columns else probe))[:, 1]
+        actual = compiled.predict_proba(probe)[:, 1]
+        error = float(np.max(np.abs(expected - actual)))
+        if error > tolerance:
+            print(f"⚠️  Compiled evaluator disabled: max error {error:.2e} exceeds {tolerance:.0e}")
+            return None
+        print(f"✅ Compiled tree evaluator ready ({len(compiled.roots)} trees, "
+              f"{len(probe)} probe rows, max error {error:.2e})")
+        return compiled
+    except Exception as e:
+        print(f"⚠️  Compiled evaluator not available: {e}")
+        return None
+
+
+def benchmark(model, compiled, X, batch_sizes=(1, 16, 64, 256, 1000), repeats=200):
+    """Median latency in milliseconds of predict_proba vs the compiled evaluator per batch size"""
+    def median_ms(fn, rows):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn(rows)
+            timings.append((time.perf_counter() - start) * 1000)
+        return float(np.median(timings))
+
+    results = {}
+    for size in batch_sizes:
+        rows = X[np.arange(size) % len(X)]
+        results[size] = {
+            'predict_proba_ms': median_ms(model.predict_proba, rows),
+            'compiled_ms': median_ms(compiled.predict_proba, rows),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    with open('XGBoost.pkl', 'rb') as file:
+        model = pickle.load(file)
+
+    compiled = compile_model(model)
+
+    if compiled is not None:
+        results = benchmark(model, compiled, make_probe(compiled, n_rows=1000))
+        print(f"{'rows':>6}{'predict_proba ms':>18}{'compiled ms':>14}")
+        for size, timings in results.items():
+            print(f"{size:>6}{timings['predict_proba_ms']:>18.3f}{timings['compiled_ms']:>14.3f}")
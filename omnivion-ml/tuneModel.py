@@ -0,0 +1,385 @@
+# ==========================
+# 📦 Imports
+# ==========================
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.metrics import accuracy_score, log_loss
+
+from xgboost import XGBClassifier
+from lightgbm import LGBMClassifier, early_stopping
+
+# ==========================
+# Search Configuration
+# ==========================
+TUNING_DIR = 'tuning'
+TRIAL_LOG = os.path.join(TUNING_DIR, 'trials.jsonl')
+FOLDS_PATH = os.path.join(TUNING_DIR, 'folds.npz')
+
+N_FOLDS = 3
+N_CONFIGS = 27          # configs sampled per model family at the first rung
+RUNG_BUDGETS = [150, 300, 600]  # max boosting rounds per rung
+ETA = 3                 # keep the best 1/ETA configs between rungs
+EARLY_STOPPING_ROUNDS = 50
+EARLY_STOPPING_HOLDOUT = 0.2  # share of each training fold held out to pick the stopping round
+SEED = 42
+
+# Without a latency budget, give up at most this much relative validation
+# logloss for the fastest finalist of each family
+LOGLOSS_TOLERANCE = 0.01
+
+# Settings every trial uses and that must carry over to the production model.
+# LightGBM ignores subsample unless bagging is switched on with subsample_freq.
+FIXED_PARAMS = {
+    'xgb': {},
+    'lgb': {'subsample_freq': 1},
+}
+
+# (low, high, kind) — "log" samples uniformly in log space
+SEARCH_SPACE = {
+    'xgb': {
+        'learning_rate': (0.01, 0.2, 'log'),
+        'max_depth': (3, 10, 'int'),
+        'subsample': (0.6, 1.0, 'float'),
+        'colsample_bytree': (0.5, 1.0, 'float'),
+        'gamma': (0.0, 1.0, 'float'),
+        'reg_lambda': (0.5, 5.0, 'log'),
+    },
+    'lgb': {
+        'learning_rate': (0.01, 0.2, 'log'),
+        'max_depth': (3, 10, 'int'),
+        'num_leaves': (15, 255, 'int'),
+        'subsample': (0.6, 1.0, 'float'),
+        'colsample_bytree': (0.5, 1.0, 'float'),
+        'reg_lambda': (0.5, 5.0, 'log'),
+    },
+}
+
+
+def sample_config(space, rng):
+    """Draw one config from a search space"""
+    config = {}
+    for name, (low, high, kind) in space.items():
+        if kind == 'int':
+            config[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            config[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            config[name] = float(rng.uniform(low, high))
+    return config
+
+
+def build_model(family, params, budget, early_stop=True):
+    """Instantiate a boosted model for a trial, single-threaded so trials can run in parallel"""
+    if family == 'xgb':
+        return XGBClassifier(
+            n_estimators=budget,
+            eval_metric='logloss',
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS if early_stop else None,
+            random_state=SEED,
+            tree_method='hist',
+            n_jobs=1,
+            **FIXED_PARAMS['xgb'],
+            **params
+        )
+    return LGBMClassifier(
+        n_estimators=budget,
+        random_state=SEED,
+        n_jobs=1,
+        verbose=-1,
+        **FIXED_PARAMS['lgb'],
+        **params
+    )
+
+
+def fit_with_early_stopping(model, family, X_tr, y_tr, X_stop, y_stop):
+    """
+    Fit with logloss early stopping on (X_stop, y_stop) and return the number
+    of rounds used. The stopping set must not be the one the trial is scored on.
+    """
+    if family == 'xgb':
+        model.fit(X_tr, y_tr, eval_set=[(X_stop, y_stop)], verbose=False)
+        return int(model.best_iteration) + 1
+    model.fit(
+        X_tr, y_tr,
+        eval_set=[(X_stop, y_stop)],
+        eval_metric='binary_logloss',
+        callbacks=[early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+    )
+    return int(model.best_iteration_ or model.n_estimators)
+
+
+def measure_latency(model, X, repeats=20):
+    """Median predict_proba latency in milliseconds for one row and for a 1k-row batch"""
+    batch = X[np.arange(1000) % len(X)]
+    single = X[:1]
+
+    def median_ms(rows):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict_proba(rows)
+            timings.append((time.perf_counter() - start) * 1000)
+        return float(np.median(timings))
+
+    return {'single_row_ms': round(median_ms(single), 3), 'batch_1k_ms': round(median_ms(batch), 3)}
+
+
+def trial_key(family, params, budget, digest):
+    """
+    Stable id for a trial, used to skip finished trials on resume. The data
+    digest and early-stopping holdout are part of the key so trials scored on
+    older data or splits are never reused.
+    """
+    blob = json.dumps([family, params, budget, digest, EARLY_STOPPING_HOLDOUT], sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+# ==========================
+# Cached Folds
+# ==========================
+def data_digest(X, y):
+    """Fingerprint of the training data, tying folds and trials to it"""
+    return hashlib.sha1(np.ascontiguousarray(X).tobytes() + np.ascontiguousarray(y).tobytes()).hexdigest()
+
+
+def load_or_create_folds(X, y, digest):
+    """
+    Reuse the stratified folds on disk when they were built for the same data,
+    so every trial (and every resumed run) is scored on identical splits.
+    Each fold is (fit, stop, val): boosting rounds are picked on the stop rows,
+    carved out of the training side, so the val rows only score the trial.
+    """
+    if os.path.exists(FOLDS_PATH):
+        cached = np.load(FOLDS_PATH, allow_pickle=False)
+        if str(cached['digest']) == digest and 'stop_0' in cached.files:
+            return [(cached[f'fit_{i}'], cached[f'stop_{i}'], cached[f'val_{i}']) for i in range(N_FOLDS)]
+
+    skf = StratifiedKFold(n_splits=N_FOLDS, shuffle=True, random_state=SEED)
+    folds = []
+    arrays = {'digest': np.array(digest)}
+    for i, (train_idx, val_idx) in enumerate(skf.split(X, y)):
+        fit_idx, stop_idx = train_test_split(
+            train_idx, test_size=EARLY_STOPPING_HOLDOUT, stratify=y[train_idx], random_state=SEED
+        )
+        folds.append((fit_idx, stop_idx, val_idx))
+        arrays[f'fit_{i}'] = fit_idx
+        arrays[f'stop_{i}'] = stop_idx
+        arrays[f'val_{i}'] = val_idx
+    np.savez(FOLDS_PATH, **arrays)
+    return folds
+
+
+# ==========================
+# Trial Workers
+# ==========================
+_worker_data = {}
+
+
+def _init_worker(X, y, folds, digest):
+    """Hand the training data to each worker process once instead of per trial"""
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+    _worker_data['folds'] = folds
+    _worker_data['digest'] = digest
+
+
+def run_trial(family, params, budget):
+    """Cross-validate one config at one budget"""
+    X, y, folds = _worker_data['X'], _worker_data['y'], _worker_data['folds']
+    digest = _worker_data['digest']
+    losses, accuracies, rounds = [], [], []
+
+    for fit_idx, stop_idx, val_idx in folds:
+        model = build_model(family, params, budget)
+        rounds.append(fit_with_early_stopping(model, family, X[fit_idx], y[fit_idx], X[stop_idx], y[stop_idx]))
+        proba = model.predict_proba(X[val_idx])[:, 1]
+        losses.append(log_loss(y[val_idx], proba))
+        accuracies.append(accuracy_score(y[val_idx], (proba >= 0.5).astype(int)))
+
+    return {
+        'key': trial_key(family, params, budget, digest),
+        'data_digest': digest,
+        'family': family,
+        'params': params,
+        'budget': budget,
+        'val_logloss': float(np.mean(losses)),
+        'val_accuracy': float(np.mean(accuracies)),
+        'best_n_estimators': int(np.median(rounds)),
+    }
+
+
+# ==========================
+# Trial Log
+# ==========================
+def load_trial_log(digest):
+    """Read finished trials for the current data from disk, keyed by trial id"""
+    trials = {}
+    if os.path.exists(TRIAL_LOG):
+        with open(TRIAL_LOG, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    if record.get('data_digest') == digest:
+                        trials[record['key']] = record
+    return trials
+
+
+def append_trial(record):
+    """Persist a finished trial immediately so an interrupted search can resume"""
+    with open(TRIAL_LOG, 'a') as file:
+        file.write(json.dumps(record) + '\n')
+
+
+# ==========================
+# Successive Halving
+# ==========================
+def run_search(X, y, families=('xgb', 'lgb'), n_workers=None, max_latency_ms=None):
+    """
+    Successive halving over the boosted models: every config gets the smallest
+    budget, the best 1/ETA move up to the next rung, and so on. Trials run in a
+    local process pool; finished trials are read back from the log instead of rerun.
+    The finalists are then timed and each family's config is picked by select_config.
+    """
+    os.makedirs(TUNING_DIR, exist_ok=True)
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y).astype(int)
+    digest = data_digest(X, y)
+    folds = load_or_create_folds(X, y, digest)
+    done = load_trial_log(digest)
+    rng = np.random.default_rng(SEED)
+
+    candidates = {f: [sample_config(SEARCH_SPACE[f], rng) for _ in range(N_CONFIGS)] for f in families}
+    results = []
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(X, y, folds, digest)) as pool:
+        for rung, budget in enumerate(RUNG_BUDGETS):
+            rung_results = {f: [] for f in families}
+            futures = []
+
+            for family in families:
+                for params in candidates[family]:
+                    key = trial_key(family, params, budget, digest)
+                    if key in done:
+                        rung_results[family].append(done[key])
+                    else:
+                        futures.append(pool.submit(run_trial, family, params, budget))
+
+            resumed = sum(len(r) for r in rung_results.values())
+            print(f"🔍 Rung {rung + 1}/{len(RUNG_BUDGETS)} (budget {budget}): "
+                  f"{len(futures)} trials to run, {resumed} resumed from log")
+
+            for future in as_completed(futures):
+                record = future.result()
+                append_trial(record)
+                done[record['key']] = record
+                rung_results[record['family']].append(record)
+                print(f"   {record['family']} logloss={record['val_logloss']:.4f} "
+                      f"acc={record['val_accuracy']:.4f} rounds={record['best_n_estimators']}")
+
+            for family in families:
+                ranked = sorted(rung_results[family], key=lambda r: r['val_logloss'])
+                results.extend(ranked)
+                keep = max(1, len(ranked) // ETA)
+                candidates[family] = [r['params'] for r in ranked[:keep]]
+
+    final = [r for r in results if r['budget'] == RUNG_BUDGETS[-1]]
+    retime_candidates(final, X, y)
+    return summarize(results, families, max_latency_ms)
+
+
+def retime_candidates(records, X, y):
+    """
+    Time the finalists one after another in this process, once the pool has
+    shut down, so latencies are not skewed by trials competing for the CPU
+    """
+    print(f"\n⏱️  Timing {len(records)} finalists")
+    for record in records:
+        model = build_model(record['family'], record['params'], record['best_n_estimators'], early_stop=False)
+        model.fit(X, y)
+        record['latency'] = measure_latency(model, X)
+
+
+# ==========================
+# Report
+# ==========================
+def pareto_front(records):
+    """Trials not beaten on both validation logloss and single-row latency by any other trial"""
+    front = []
+    for r in records:
+        dominated = any(
+            o['val_logloss'] <= r['val_logloss']
+            and o['latency']['single_row_ms'] <= r['latency']['single_row_ms']
+            and o is not r
+            and (o['val_logloss'] < r['val_logloss'] or o['latency']['single_row_ms'] < r['latency']['single_row_ms'])
+            for o in records
+        )
+        if not dominated:
+            front.append(r)
+    return sorted(front, key=lambda r: r['latency']['single_row_ms'])
+
+
+def select_config(finalists, max_latency_ms=None):
+    """
+    Pick the config to ship from one family's timed finalists, returning the
+    trial and the rule that chose it. With a latency budget this is the most
+    accurate config whose single-row latency fits it, or the fastest one if
+    none does; otherwise the fastest config within LOGLOSS_TOLERANCE of the
+    best validation logloss. Either way the pick lies on the Pareto front.
+    """
+    front = pareto_front(finalists)
+    if max_latency_ms is not None:
+        fitting = [r for r in front if r['latency']['single_row_ms'] <= max_latency_ms]
+        if fitting:
+            return min(fitting, key=lambda r: r['val_logloss']), f"most accurate within {max_latency_ms} ms"
+        print(f"⚠️  No {front[0]['family']} finalist meets the {max_latency_ms} ms budget, using the fastest")
+        return front[0], f"fastest, none within {max_latency_ms} ms"
+
+    best_logloss = min(r['val_logloss'] for r in front)
+    eligible = [r for r in front if r['val_logloss'] <= best_logloss * (1 + LOGLOSS_TOLERANCE)]
+    return eligible[0], f"fastest within {LOGLOSS_TOLERANCE:.0%} of best logloss"
+
+
+def summarize(results, families, max_latency_ms=None):
+    """Chosen config per family from the final rung plus the accuracy vs latency trade-off"""
+    final_budget = RUNG_BUDGETS[-1]
+    timed = [r for r in results if r['budget'] == final_budget and 'latency' in r]
+    best = {}
+    selected = {}
+    for family in families:
+        finalists = [r for r in timed if r['family'] == family]
+        if finalists:
+            chosen, rule = select_config(finalists, max_latency_ms)
+            best[family] = dict(FIXED_PARAMS[family], **chosen['params'], n_estimators=chosen['best_n_estimators'])
+            selected[family] = {
+                'rule': rule,
+                'val_logloss': chosen['val_logloss'],
+                'val_accuracy': chosen['val_accuracy'],
+                'latency': chosen['latency'],
+            }
+
+    front = pareto_front(timed)
+
+    print("\n🏆 Selected configs:")
+    for family, params in best.items():
+        info = selected[family]
+        print(f"   {family} ({info['rule']}): logloss={info['val_logloss']:.4f} "
+              f"1 row={info['latency']['single_row_ms']:.3f} ms")
+        print(f"      {params}")
+
+    print("\n⚖️  Accuracy vs inference latency (final rung, Pareto front):")
+    print(f"   {'model':<6}{'logloss':>10}{'accuracy':>10}{'1 row ms':>10}{'1k rows ms':>12}")
+    for r in front:
+        print(f"   {r['family']:<6}{r['val_logloss']:>10.4f}{r['val_accuracy']:>10.4f}"
+              f"{r['latency']['single_row_ms']:>10.3f}{r['latency']['batch_1k_ms']:>12.3f}")
+
+    report = {'best': best, 'selected': selected, 'pareto_front': front}
+    with open(os.path.join(TUNING_DIR, 'report.json'), 'w') as file:
+        json.dump(report, file, indent=2)
+    return report